@@ -1,8 +1,11 @@
 import os
+import sys
 import json
 import sqlite3
 import google.generativeai as genai
-from datetime import datetime
+from datetime import datetime, timezone
+
+from rollups_mensais import agregar_transacoes, extrair_features, janela_fechada, proximo_mes, resumo_contas
 
 
 # ==============================================================================
@@ -53,6 +56,101 @@ def buscar_transacoes_usuario(user_id):
 
 import requests
 
+# ---------------------------------------------------------
+# 2. Leitura dos Rollups Mensais (O(meses), não O(transações))
+# ---------------------------------------------------------
+def configuracao_supabase():
+    supabase_url = os.environ.get("SUPABASE_URL") or os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+    service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not supabase_url or not service_key:
+        return None, None
+    return supabase_url, {"apikey": service_key, "Authorization": f"Bearer {service_key}"}
+
+
+def dados_simulados(user_id):
+    """Fallback sem Supabase: agrega o histórico simulado e mantém saldo/reserva do exemplo."""
+    simulado = buscar_transacoes_usuario(user_id)
+    dados = extrair_features(agregar_transacoes([
+        {"date": t["data"], "category": t["categoria"], "amount": abs(t["valor"]),
+         "type": "income" if t["tipo"] == "entrada" else "expense"}
+        for t in simulado["historico_30_dias"]
+    ]))
+    dados.update({
+        "saldo_atual": simulado["saldo_atual"],
+        "reserva_emergencia_estimada": simulado["reserva_emergencia_estimada"],
+    })
+    return dados
+
+
+def listar_usuarios():
+    """
+    IDs (UUID) dos usuários a analisar. Sem Supabase, retorna [None]:
+    roda com dados simulados e a API atribui o relatório ao primeiro usuário.
+    Retorna None em caso de falha na leitura.
+    """
+    supabase_url, headers = configuracao_supabase()
+    if not supabase_url:
+        return [None]
+
+    try:
+        response = requests.get(
+            f"{supabase_url}/rest/v1/profiles",
+            params={"select": "id"},
+            headers=headers,
+            timeout=30
+        )
+        response.raise_for_status()
+        return [p["id"] for p in response.json()]
+    except requests.RequestException as e:
+        print(f"❌ Falha ao listar usuários: {e}")
+        return None
+
+
+def buscar_rollups_usuario(user_id, inicio, fim):
+    """
+    Lê a tabela transaction_monthly_rollups (mantida por trigger no Supabase)
+    de `inicio` a `fim` ('YYYY-MM', meses fechados). Mês corrente e parcelas
+    futuras ficam de fora. Retorna None em caso de falha na leitura.
+    """
+    supabase_url, headers = configuracao_supabase()
+
+    try:
+        response = requests.get(
+            f"{supabase_url}/rest/v1/transaction_monthly_rollups",
+            params=[
+                ("select", "month,category,type,total,tx_count,recurring_total"),
+                ("user_id", f"eq.{user_id}"),
+                ("month", f"gte.{inicio}-01"),
+                ("month", f"lt.{proximo_mes(fim)}-01"),
+                ("order", "month.asc"),
+            ],
+            headers=headers,
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        print(f"❌ Falha ao ler rollups do usuário {user_id}: {e}")
+        return None
+
+
+def buscar_contas_usuario(user_id):
+    """Saldos e tipos das contas do usuário (O(contas)). Retorna None em caso de falha."""
+    supabase_url, headers = configuracao_supabase()
+
+    try:
+        response = requests.get(
+            f"{supabase_url}/rest/v1/accounts",
+            params={"select": "balance,type", "user_id": f"eq.{user_id}"},
+            headers=headers,
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException as e:
+        print(f"❌ Falha ao ler contas do usuário {user_id}: {e}")
+        return None
+
 # ---------------------------------------------------------
 # 2. Envio para a API do Site (Via HTTP Seguro)
 # ---------------------------------------------------------
@@ -69,7 +167,7 @@ def salvar_risco_no_banco(user_id, resultado_json):
     api_secret = os.environ.get("CRON_SECRET", "monk_secret_123")
     
     payload = {
-        "user_id": None, # API vai atribuir ao primeiro usuário se nulo
+        "user_id": user_id, # API vai atribuir ao primeiro usuário se nulo
         "report": resultado_json
     }
     
@@ -101,12 +199,29 @@ def analisar_perfil(user_id):
         print("Pulei a análise pois não tem API Key.")
         return
 
-    dados = buscar_transacoes_usuario(user_id)
+    # Apenas agregados anônimos (sem descrições nem PII) vão para a IA
+    if configuracao_supabase()[0]:
+        inicio, fim = janela_fechada(datetime.now(timezone.utc))
+        rollups = buscar_rollups_usuario(user_id, inicio, fim)
+        contas = buscar_contas_usuario(user_id)
+        if rollups is None or contas is None:
+            return
+        if not rollups:
+            print(f"Pulei o usuário {user_id}: sem transações no período.")
+            return
+        dados = extrair_features(rollups, inicio, fim)
+        dados.update(resumo_contas(contas))
+    else:
+        print("AVISO: Supabase não configurado. Usando dados simulados.")
+        dados = dados_simulados(user_id)
     
     # O Prompt Estruturado
     prompt = f"""
     Atue como um analista de risco financeiro algorítmico.
-    Analise os dados financeiros brutos deste usuário e gere duas matrizes de risco.
+    Analise os agregados financeiros mensais deste usuário (meses fechados, sem transações
+    individuais) e gere duas matrizes de risco.
+    "saldo_atual" e "reserva_emergencia_estimada" vêm dos saldos das contas;
+    "fluxo_liquido_acumulado" é só a soma de entradas - saídas na janela, não um saldo.
     
     DADOS DO USUÁRIO:
     {json.dumps(dados)}
@@ -136,6 +251,10 @@ def analisar_perfil(user_id):
     except Exception as e:
         print(f"Erro ao processar usuário {user_id}: {e}")
 
-# Executa para um usuário de teste
+# Executa para todos os usuários (ou para o exemplo simulado)
 if __name__ == "__main__":
-    analisar_perfil(user_id=123)
+    usuarios = listar_usuarios()
+    if usuarios is None:
+        sys.exit(1)
+    for user_id in usuarios:
+        analisar_perfil(user_id=user_id)
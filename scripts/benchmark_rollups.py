@@ -0,0 +1,137 @@
+import random
+import sys
+import time
+from datetime import date
+
+from rollups_mensais import agregar_transacoes, aplicar_evento, extrair_features, linhas_dos_buckets
+
+
+# ==============================================================================
+# BENCHMARK: features de risco via rollup mensal vs varredura das transações
+# Uso: python3 scripts/benchmark_rollups.py [anos] [transacoes_por_mes]
+#
+# 1. Consistência: aplica um fluxo de INSERT/UPDATE/DELETE no MODELO PYTHON do
+#    trigger (aplicar_evento) e compara com um rebuild (agregar_transacoes).
+#    O SQL real não roda aqui: o trigger e o rebuild_transaction_rollups() da
+#    migration são testados em test_rollups_trigger.py (precisa de Postgres).
+# 2. Tempo: mede só o processamento em memória. NÃO inclui buscar as
+#    O(transações) linhas do Supabase na varredura bruta, que em produção é
+#    o custo dominante. O speedup real da leitura é maior que o impresso aqui.
+# ==============================================================================
+
+CATEGORIAS_GASTO = ["Alimentação", "Transporte", "Lazer", "Saúde", "Compras", "Cartao Credito"]
+FIXOS = [("Aluguel", 1200.00), ("Internet", 120.00), ("Academia", 90.00)]
+
+
+def gerar_transacoes(anos, por_mes, seed=42):
+    """Dataset sintético: salário + fixos recorrentes + gastos variáveis por mês."""
+    rng = random.Random(seed)
+    hoje = date.today()
+    transacoes = []
+
+    for i in range(anos * 12):
+        ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - i, 12)
+        prefixo = f"{ano:04d}-{mes + 1:02d}"
+
+        transacoes.append({"date": f"{prefixo}-05", "category": "Salário", "type": "income",
+                           "amount": 5000.00, "recurrence_id": "rec-salario"})
+        for nome, valor in FIXOS:
+            transacoes.append({"date": f"{prefixo}-10", "category": nome, "type": "expense",
+                               "amount": valor, "recurrence_id": f"rec-{nome}"})
+        for _ in range(por_mes):
+            transacoes.append({
+                "date": f"{prefixo}-{rng.randint(1, 28):02d}",
+                "category": rng.choice(CATEGORIAS_GASTO),
+                "type": "expense",
+                "amount": round(rng.uniform(5, 150), 2),
+                "recurrence_id": None,
+            })
+
+    return transacoes
+
+
+def simular_eventos(transacoes, n_eventos, seed=7):
+    """
+    Insere todas as transações e depois aplica `n_eventos` UPDATEs/DELETEs
+    aleatórios, mantendo os buckets via deltas como o trigger faria.
+    Retorna (buckets, transações finais).
+    """
+    rng = random.Random(seed)
+    buckets = {}
+    atuais = []
+    for t in transacoes:
+        aplicar_evento(buckets, nova=t)
+        atuais.append(t)
+
+    for _ in range(n_eventos):
+        i = rng.randrange(len(atuais))
+        antiga = atuais[i]
+        if rng.random() < 0.3:
+            aplicar_evento(buckets, antiga=antiga)
+            atuais[i] = atuais[-1]
+            atuais.pop()
+            continue
+
+        # Edição que pode mover a transação de mês e/ou categoria
+        nova = dict(antiga)
+        nova["amount"] = round(rng.uniform(5, 500), 2)
+        if rng.random() < 0.5:
+            nova["category"] = rng.choice(CATEGORIAS_GASTO)
+        if rng.random() < 0.5:
+            nova["date"] = rng.choice(atuais)["date"]
+        if rng.random() < 0.2:
+            nova["recurrence_id"] = None if antiga.get("recurrence_id") else "rec-editada"
+        aplicar_evento(buckets, antiga=antiga, nova=nova)
+        atuais[i] = nova
+
+    return buckets, atuais
+
+
+def normalizar(linhas):
+    return sorted(
+        (r["month"], r["category"], r["type"], round(r["total"], 2), r["tx_count"], round(r["recurring_total"], 2))
+        for r in linhas
+    )
+
+
+def cronometrar(fn, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = fn()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    anos = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    por_mes = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    repeticoes = 5
+
+    transacoes = gerar_transacoes(anos, por_mes)
+    n_eventos = len(transacoes) // 2
+
+    # Rollup mantido por deltas (trigger) vs rebuild a partir do estado final
+    inicio = time.perf_counter()
+    buckets, atuais = simular_eventos(transacoes, n_eventos)
+    t_eventos = time.perf_counter() - inicio
+
+    if normalizar(linhas_dos_buckets(buckets)) != normalizar(agregar_transacoes(atuais)):
+        print("❌ Divergência entre rollup incremental e rebuild!")
+        sys.exit(1)
+
+    rollups = linhas_dos_buckets(buckets)
+    t_raw, _ = cronometrar(lambda: extrair_features(agregar_transacoes(atuais)), repeticoes)
+    t_rollup, _ = cronometrar(lambda: extrair_features(rollups), repeticoes)
+
+    total_eventos = len(transacoes) + n_eventos
+    print(f"Dataset: {anos} anos, {len(atuais)} transações -> {len(rollups)} linhas de rollup")
+    print(f"Consistência    : ✅ {total_eventos} eventos (modelo Python) == rebuild")
+    print(f"Delta por evento: {t_eventos / total_eventos * 1e6:8.2f} µs")
+    print(f"Varredura bruta : {t_raw * 1000:8.2f} ms (sem o custo de buscar as transações)")
+    print(f"Rollup mensal   : {t_rollup * 1000:8.2f} ms")
+    print(f"Speedup         : {t_raw / t_rollup:8.1f}x (melhor de {repeticoes}, só CPU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+
+# ==============================================================================
+# ROLLUPS MENSAIS (user / mês / categoria / tipo)
+# ==============================================================================
+# Espelha a tabela `transaction_monthly_rollups`
+# (supabase/migrations/20261019_transaction_monthly_rollups.sql).
+# O banco mantém os buckets via trigger; aqui só lemos e extraímos features.
+# Custo: O(meses x categorias) em vez de O(transações).
+# ==============================================================================
+
+def mes_da_data(data):
+    """'2023-10-05' ou '2023-10-05T12:00:00+00:00' -> '2023-10-01'"""
+    return f"{str(data)[:7]}-01"
+
+
+def agregar_transacoes(transacoes):
+    """
+    Varredura completa das transações brutas -> linhas no formato do rollup.
+    Mesma regra do rebuild_transaction_rollups() no SQL.
+    """
+    buckets = defaultdict(lambda: {"total": 0.0, "tx_count": 0, "recurring_total": 0.0})
+
+    for t in transacoes:
+        chave = (mes_da_data(t["date"]), t.get("category") or "Outros", t["type"])
+        bucket = buckets[chave]
+        bucket["total"] += t["amount"]
+        bucket["tx_count"] += 1
+        if t.get("recurrence_id"):
+            bucket["recurring_total"] += t["amount"]
+
+    return linhas_dos_buckets(buckets)
+
+
+def aplicar_delta(buckets, transacao, sinal):
+    """
+    Espelho do apply_transaction_rollup_delta() do SQL: soma (sinal=1) ou
+    remove (sinal=-1) uma transação do seu bucket e descarta buckets vazios.
+    `buckets` é um dict (month, category, type) -> valores.
+    """
+    chave = (mes_da_data(transacao["date"]), transacao.get("category") or "Outros", transacao["type"])
+    bucket = buckets.setdefault(chave, {"total": 0.0, "tx_count": 0, "recurring_total": 0.0})
+    bucket["total"] += sinal * transacao["amount"]
+    bucket["tx_count"] += sinal
+    if transacao.get("recurrence_id"):
+        bucket["recurring_total"] += sinal * transacao["amount"]
+    if bucket["tx_count"] <= 0:
+        del buckets[chave]
+
+
+def aplicar_evento(buckets, antiga=None, nova=None):
+    """Espelho do trigger: INSERT (só nova), UPDATE (antiga e nova), DELETE (só antiga)."""
+    if antiga is not None:
+        aplicar_delta(buckets, antiga, -1)
+    if nova is not None:
+        aplicar_delta(buckets, nova, 1)
+
+
+def linhas_dos_buckets(buckets):
+    return [
+        {"month": month, "category": category, "type": tipo, **valores}
+        for (month, category, tipo), valores in buckets.items()
+    ]
+
+
+def proximo_mes(chave):
+    """'2023-12' -> '2024-01'"""
+    ano, mes = int(chave[:4]), int(chave[5:7])
+    ano, mes = divmod(ano * 12 + mes, 12)
+    return f"{ano:04d}-{mes + 1:02d}"
+
+
+def janela_fechada(hoje, meses=24):
+    """
+    (inicio, fim) em 'YYYY-MM' dos últimos `meses` meses FECHADOS antes de `hoje`.
+    O mês corrente fica de fora: ainda está em andamento.
+    """
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 2, 12)
+    fim = f"{ano:04d}-{mes + 1:02d}"
+    ano, mes = divmod(hoje.year * 12 + hoje.month - 1 - meses, 12)
+    inicio = f"{ano:04d}-{mes + 1:02d}"
+    return inicio, fim
+
+
+def extrair_features(rollups, inicio=None, fim=None):
+    """
+    Features de risco a partir das linhas do rollup:
+    renda/gasto mensal, gasto por categoria, compromissos recorrentes e fluxo líquido.
+    `inicio`/`fim` ('YYYY-MM') delimitam a janela pedida; linhas fora dela são ignoradas.
+    """
+    meses = defaultdict(lambda: {"entradas": 0.0, "saidas": 0.0, "compromissos_recorrentes": 0.0})
+    despesas_por_categoria = defaultdict(float)
+
+    for r in rollups:
+        chave = str(r["month"])[:7]
+        if (inicio and chave < inicio) or (fim and chave > fim):
+            continue
+        mes = meses[chave]
+        total = float(r["total"])
+        if r["type"] == "income":
+            mes["entradas"] += total
+        else:
+            mes["saidas"] += total
+            mes["compromissos_recorrentes"] += float(r.get("recurring_total") or 0)
+            despesas_por_categoria[r["category"]] += total
+
+    # Do primeiro mês com dados até `fim`, meses sem transações entram zerados:
+    # médias e tendência usam a janela contínua (inatividade recente também conta).
+    chaves = []
+    if meses:
+        chave, ultimo = min(meses), max(fim or "", max(meses))
+        while chave <= ultimo:
+            chaves.append(chave)
+            chave = proximo_mes(chave)
+
+    serie = []
+    fluxo_acumulado = 0.0
+    for chave in chaves:
+        mes = meses[chave]
+        saldo_mes = mes["entradas"] - mes["saidas"]
+        fluxo_acumulado += saldo_mes
+        serie.append({
+            "mes": chave,
+            "entradas": round(mes["entradas"], 2),
+            "saidas": round(mes["saidas"], 2),
+            "compromissos_recorrentes": round(mes["compromissos_recorrentes"], 2),
+            "saldo_mes": round(saldo_mes, 2),
+            "fluxo_liquido_acumulado": round(fluxo_acumulado, 2),
+        })
+
+    n = len(serie) or 1
+    return {
+        "meses": serie,
+        "renda_media_mensal": round(sum(m["entradas"] for m in serie) / n, 2),
+        "gasto_medio_mensal": round(sum(m["saidas"] for m in serie) / n, 2),
+        "compromissos_recorrentes_medios": round(sum(m["compromissos_recorrentes"] for m in serie) / n, 2),
+        "despesas_por_categoria": {
+            cat: round(valor, 2)
+            for cat, valor in sorted(despesas_por_categoria.items(), key=lambda kv: -kv[1])
+        },
+        "tendencia_saldo": tendencia_saldo(serie),
+    }
+
+
+def resumo_contas(contas):
+    """
+    Âncora de saldo a partir da tabela accounts (O(contas)).
+    saldo_atual: soma de todas as contas (cartão de crédito devedor entra negativo).
+    reserva_emergencia_estimada: saldo positivo em poupança/investimentos.
+    """
+    saldo_atual = sum(float(c.get("balance") or 0) for c in contas)
+    reserva = sum(
+        max(float(c.get("balance") or 0), 0)
+        for c in contas
+        if c.get("type") in ("savings", "investment")
+    )
+    return {
+        "saldo_atual": round(saldo_atual, 2),
+        "reserva_emergencia_estimada": round(reserva, 2),
+    }
+
+
+def tendencia_saldo(serie, janela=3):
+    """Compara o saldo médio dos últimos `janela` meses com os `janela` anteriores."""
+    if len(serie) < 2:
+        return "Estavel"
+    recentes = serie[-janela:]
+    anteriores = serie[-2 * janela:-janela] or serie[:1]
+    media_recente = sum(m["saldo_mes"] for m in recentes) / len(recentes)
+    media_anterior = sum(m["saldo_mes"] for m in anteriores) / len(anteriores)
+    if media_recente > media_anterior:
+        return "Crescente"
+    if media_recente < media_anterior:
+        return "Decrescente"
+    return "Estavel"
@@ -0,0 +1,147 @@
+from datetime import date
+
+from rollups_mensais import (
+    agregar_transacoes,
+    aplicar_evento,
+    extrair_features,
+    janela_fechada,
+    linhas_dos_buckets,
+    proximo_mes,
+    resumo_contas,
+    tendencia_saldo,
+)
+
+
+def rollup(month, category, tipo, total, recurring_total=0, tx_count=1):
+    return {"month": month, "category": category, "type": tipo, "total": total,
+            "tx_count": tx_count, "recurring_total": recurring_total}
+
+
+def test_lista_vazia():
+    features = extrair_features([])
+    assert features["meses"] == []
+    assert features["renda_media_mensal"] == 0
+    assert features["gasto_medio_mensal"] == 0
+    assert features["despesas_por_categoria"] == {}
+    assert features["tendencia_saldo"] == "Estavel"
+
+
+def test_um_mes():
+    features = extrair_features([
+        rollup("2024-03-01", "Salário", "income", 5000),
+        rollup("2024-03-01", "Aluguel", "expense", 1200, recurring_total=1200),
+        rollup("2024-03-01", "Lazer", "expense", 300, tx_count=4),
+    ])
+    assert features["meses"] == [{
+        "mes": "2024-03", "entradas": 5000, "saidas": 1500, "compromissos_recorrentes": 1200,
+        "saldo_mes": 3500, "fluxo_liquido_acumulado": 3500,
+    }]
+    assert features["compromissos_recorrentes_medios"] == 1200
+    assert list(features["despesas_por_categoria"]) == ["Aluguel", "Lazer"]
+    assert features["tendencia_saldo"] == "Estavel"
+
+
+def test_meses_faltando_entram_zerados():
+    features = extrair_features([
+        rollup("2023-11-01", "Salário", "income", 3000),
+        rollup("2024-02-01", "Salário", "income", 3000),
+    ])
+    assert [m["mes"] for m in features["meses"]] == ["2023-11", "2023-12", "2024-01", "2024-02"]
+    assert features["meses"][1]["entradas"] == 0
+    assert features["renda_media_mensal"] == 1500
+    assert features["meses"][-1]["fluxo_liquido_acumulado"] == 6000
+
+
+def test_mes_corrente_fica_fora_da_janela():
+    # +2000/mês por nove meses fechados e 400 de gastos no mês em andamento
+    rollups = []
+    for i in range(1, 10):
+        mes = f"2024-{i:02d}-01"
+        rollups.append(rollup(mes, "Salário", "income", 5000))
+        rollups.append(rollup(mes, "Aluguel", "expense", 3000))
+    rollups.append(rollup("2024-10-01", "Mercado", "expense", 400))
+
+    inicio, fim = janela_fechada(date(2024, 10, 14), meses=24)
+    features = extrair_features(rollups, inicio, fim)
+
+    assert features["meses"][-1]["mes"] == "2024-09"
+    assert features["renda_media_mensal"] == 5000
+    assert features["gasto_medio_mensal"] == 3000
+    assert features["tendencia_saldo"] == "Estavel"
+
+
+def test_inatividade_recente_preenche_ate_o_fim_da_janela():
+    # Último movimento em set/2023, janela pedida até dez/2023
+    rollups = [rollup(f"2023-{i:02d}-01", "Salário", "income", 3000) for i in range(1, 10)]
+    features = extrair_features(rollups, "2022-01", "2023-12")
+
+    assert [m["mes"] for m in features["meses"]][-3:] == ["2023-10", "2023-11", "2023-12"]
+    assert len(features["meses"]) == 12  # começa no primeiro mês com dados
+    assert features["renda_media_mensal"] == 2250
+    assert features["tendencia_saldo"] == "Decrescente"
+
+
+def test_janela_fechada():
+    assert janela_fechada(date(2024, 10, 14), meses=24) == ("2022-10", "2024-09")
+    assert janela_fechada(date(2024, 1, 31), meses=3) == ("2023-10", "2023-12")
+
+
+def test_resumo_contas():
+    resumo = resumo_contas([
+        {"balance": 1500, "type": "checking"},
+        {"balance": "3000.50", "type": "savings"},
+        {"balance": 2000, "type": "investment"},
+        {"balance": -800, "type": "credit"},
+    ])
+    assert resumo == {"saldo_atual": 5700.50, "reserva_emergencia_estimada": 5000.50}
+    assert resumo_contas([]) == {"saldo_atual": 0, "reserva_emergencia_estimada": 0}
+
+
+def test_valores_como_string_do_postgrest():
+    features = extrair_features([
+        rollup("2024-01-01", "Salário", "income", "2500.50"),
+        rollup("2024-01-01", "Aluguel", "expense", "1000.25", recurring_total="1000.25"),
+        rollup("2024-01-01", "Lazer", "expense", "99.99", recurring_total=None),
+    ])
+    mes = features["meses"][0]
+    assert mes["entradas"] == 2500.50
+    assert mes["saidas"] == 1100.24
+    assert mes["compromissos_recorrentes"] == 1000.25
+
+
+def test_tendencia_saldo():
+    serie = [{"saldo_mes": v} for v in (100, 100, 100, 50, 40, 30)]
+    assert tendencia_saldo(serie) == "Decrescente"
+    serie = [{"saldo_mes": v} for v in (10, 20, 30, 100, 200, 300)]
+    assert tendencia_saldo(serie) == "Crescente"
+
+
+def test_proximo_mes_vira_o_ano():
+    assert proximo_mes("2023-12") == "2024-01"
+    assert proximo_mes("2024-01") == "2024-02"
+
+
+def test_agregar_transacoes():
+    linhas = agregar_transacoes([
+        {"date": "2024-05-02", "category": "Mercado", "type": "expense", "amount": 50},
+        {"date": "2024-05-20T10:00:00+00:00", "category": "Mercado", "type": "expense", "amount": 30},
+        {"date": "2024-05-10", "category": None, "type": "expense", "amount": 10, "recurrence_id": "r1"},
+    ])
+    por_chave = {(r["month"], r["category"]): r for r in linhas}
+    assert por_chave[("2024-05-01", "Mercado")]["total"] == 80
+    assert por_chave[("2024-05-01", "Mercado")]["tx_count"] == 2
+    assert por_chave[("2024-05-01", "Outros")]["recurring_total"] == 10
+
+
+def test_eventos_incrementais_igualam_rebuild():
+    a = {"date": "2024-01-05", "category": "Aluguel", "type": "expense", "amount": 1200, "recurrence_id": "r1"}
+    b = {"date": "2024-01-10", "category": "Lazer", "type": "expense", "amount": 80}
+    b_editada = dict(b, date="2024-02-03", category="Saúde", amount=95)
+
+    buckets = {}
+    aplicar_evento(buckets, nova=a)
+    aplicar_evento(buckets, nova=b)
+    aplicar_evento(buckets, antiga=b, nova=b_editada)  # UPDATE muda mês e categoria
+    aplicar_evento(buckets, antiga=a)                   # DELETE
+
+    assert linhas_dos_buckets(buckets) == agregar_transacoes([b_editada])
@@ -0,0 +1,190 @@
+import os
+import random
+import uuid
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from rollups_mensais import aplicar_evento, linhas_dos_buckets
+
+# ==============================================================================
+# Roda a migration real (trigger + rebuild) num Postgres descartável.
+# Uso: ROLLUPS_TEST_DATABASE_URL=postgresql://... python3 -m pytest scripts/
+# Cria e apaga um banco temporário; sem a variável, os testes são pulados.
+# ==============================================================================
+
+psycopg = pytest.importorskip("psycopg")
+
+DATABASE_URL = os.environ.get("ROLLUPS_TEST_DATABASE_URL")
+MIGRATION = (Path(__file__).resolve().parent.parent
+             / "supabase/migrations/20261019_transaction_monthly_rollups.sql")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="ROLLUPS_TEST_DATABASE_URL não definida")
+
+# O mínimo do Supabase que a migration referencia (auth, roles, transactions)
+SCHEMA_SUPABASE = """
+DO $$ BEGIN
+    IF NOT EXISTS (SELECT FROM pg_roles WHERE rolname = 'anon') THEN CREATE ROLE anon; END IF;
+    IF NOT EXISTS (SELECT FROM pg_roles WHERE rolname = 'authenticated') THEN CREATE ROLE authenticated; END IF;
+END $$;
+
+CREATE SCHEMA auth;
+CREATE TABLE auth.users (id UUID PRIMARY KEY);
+CREATE FUNCTION auth.uid() RETURNS UUID LANGUAGE sql AS 'SELECT NULL::uuid';
+
+CREATE TABLE recurrences (id UUID DEFAULT gen_random_uuid() PRIMARY KEY);
+
+CREATE TABLE transactions (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL,
+    type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+    date TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    recurrence_id UUID REFERENCES recurrences(id) ON DELETE SET NULL
+);
+"""
+
+CATEGORIAS = ["Salário", "Aluguel", "Mercado", "Lazer"]
+MESES = ["2024-01", "2024-02", "2024-03", "2024-12", "2025-01"]
+
+
+@pytest.fixture
+def banco():
+    nome = f"rollups_test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(DATABASE_URL, autocommit=True) as admin:
+        admin.execute(f'CREATE DATABASE "{nome}"')
+    try:
+        url = psycopg.conninfo.make_conninfo(DATABASE_URL, dbname=nome)
+        with psycopg.connect(url, autocommit=True) as conn:
+            conn.execute(SCHEMA_SUPABASE)
+            conn.execute(MIGRATION.read_text())
+            conn.url = url
+            yield conn
+    finally:
+        with psycopg.connect(DATABASE_URL, autocommit=True) as admin:
+            admin.execute(f'DROP DATABASE IF EXISTS "{nome}" WITH (FORCE)')
+
+
+def snapshot(conn):
+    return sorted(conn.execute(
+        "SELECT user_id::text, month::text, category, type, total, tx_count, recurring_total "
+        "FROM transaction_monthly_rollups"
+    ).fetchall())
+
+
+def modelo_python(por_usuario):
+    linhas = []
+    for user_id, buckets in por_usuario.items():
+        for r in linhas_dos_buckets(buckets):
+            linhas.append((
+                user_id, r["month"], r["category"], r["type"],
+                Decimal(str(round(r["total"], 2))).quantize(Decimal("0.01")),
+                r["tx_count"],
+                Decimal(str(round(r["recurring_total"], 2))).quantize(Decimal("0.01")),
+            ))
+    return sorted(linhas)
+
+
+def test_trigger_igual_ao_rebuild_e_ao_modelo_python(banco):
+    rng = random.Random(3)
+    usuarios = [str(uuid.uuid4()) for _ in range(2)]
+    for u in usuarios:
+        banco.execute("INSERT INTO auth.users (id) VALUES (%s)", (u,))
+    recorrencia = banco.execute("INSERT INTO recurrences DEFAULT VALUES RETURNING id::text").fetchone()[0]
+
+    def transacao_aleatoria():
+        return {
+            "user_id": rng.choice(usuarios),
+            # Meio-dia UTC: o mês do trigger (AT TIME ZONE 'UTC') bate com mes_da_data()
+            "date": f"{rng.choice(MESES)}-{rng.randint(1, 28):02d}T12:00:00+00:00",
+            "category": rng.choice(CATEGORIAS),
+            "type": rng.choice(["income", "expense"]),
+            "amount": round(rng.uniform(1, 900), 2),
+            "recurrence_id": recorrencia if rng.random() < 0.3 else None,
+        }
+
+    colunas = ("user_id", "date", "category", "type", "amount", "recurrence_id")
+    modelo = {u: {} for u in usuarios}
+    atuais = {}
+
+    for _ in range(300):
+        op = rng.random()
+        if op < 0.5 or not atuais:
+            t = transacao_aleatoria()
+            tx_id = banco.execute(
+                "INSERT INTO transactions (user_id, date, category, type, amount, recurrence_id) "
+                "VALUES (%s, %s, %s, %s, %s, %s) RETURNING id::text",
+                tuple(t[c] for c in colunas),
+            ).fetchone()[0]
+            aplicar_evento(modelo[t["user_id"]], nova=t)
+            atuais[tx_id] = t
+        elif op < 0.8:
+            # UPDATE de uma ou mais colunas (pode mudar usuário, mês, categoria, tipo...)
+            tx_id = rng.choice(list(atuais))
+            antiga = atuais[tx_id]
+            sorteio = transacao_aleatoria()
+            nova = dict(antiga, **{c: sorteio[c] for c in rng.sample(colunas, rng.randint(1, 3))})
+            banco.execute(
+                "UPDATE transactions SET user_id = %s, date = %s, category = %s, type = %s, "
+                "amount = %s, recurrence_id = %s WHERE id = %s",
+                tuple(nova[c] for c in colunas) + (tx_id,),
+            )
+            aplicar_evento(modelo[antiga["user_id"]], antiga=antiga)
+            aplicar_evento(modelo[nova["user_id"]], nova=nova)
+            atuais[tx_id] = nova
+        elif op < 0.9:
+            # UPDATE de coluna não acompanhada pelo trigger: nada muda
+            banco.execute("UPDATE transactions SET description = 'editado' WHERE id = %s",
+                          (rng.choice(list(atuais)),))
+        else:
+            tx_id = rng.choice(list(atuais))
+            banco.execute("DELETE FROM transactions WHERE id = %s", (tx_id,))
+            antiga = atuais.pop(tx_id)
+            aplicar_evento(modelo[antiga["user_id"]], antiga=antiga)
+
+    incremental = snapshot(banco)
+    assert incremental == modelo_python(modelo)
+
+    banco.execute("SELECT rebuild_transaction_rollups()")
+    assert snapshot(banco) == incremental
+
+    # Rebuild de um usuário só mexe nas linhas dele
+    banco.execute("DELETE FROM transaction_monthly_rollups")
+    banco.execute("SELECT rebuild_transaction_rollups(%s)", (usuarios[0],))
+    assert snapshot(banco) == [r for r in incremental if r[0] == usuarios[0]]
+
+
+def test_bucket_vazio_e_removido(banco):
+    user_id = str(uuid.uuid4())
+    banco.execute("INSERT INTO auth.users (id) VALUES (%s)", (user_id,))
+    tx_id = banco.execute(
+        "INSERT INTO transactions (user_id, date, category, type, amount) "
+        "VALUES (%s, '2024-05-10', 'Lazer', 'expense', 50) RETURNING id",
+        (user_id,),
+    ).fetchone()[0]
+    assert len(snapshot(banco)) == 1
+
+    banco.execute("UPDATE transactions SET category = 'Saúde' WHERE id = %s", (tx_id,))
+    assert [r[2] for r in snapshot(banco)] == ["Saúde"]
+
+    banco.execute("DELETE FROM transactions WHERE id = %s", (tx_id,))
+    assert snapshot(banco) == []
+
+
+def test_rebuild_bloqueia_escritas_concorrentes(banco):
+    user_id = str(uuid.uuid4())
+    banco.execute("INSERT INTO auth.users (id) VALUES (%s)", (user_id,))
+
+    with psycopg.connect(banco.url) as rebuild, psycopg.connect(banco.url, autocommit=True) as escritor:
+        rebuild.execute("SELECT rebuild_transaction_rollups()")  # transação aberta segura o lock
+        escritor.execute("SET lock_timeout = '200ms'")
+        with pytest.raises(psycopg.errors.LockNotAvailable):
+            escritor.execute(
+                "INSERT INTO transactions (user_id, category, type, amount) "
+                "VALUES (%s, 'Lazer', 'expense', 10)",
+                (user_id,),
+            )
+        rebuild.commit()
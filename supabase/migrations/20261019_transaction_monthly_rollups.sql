@@ -0,0 +1,138 @@
+-- Materialized monthly rollups of transactions (per user / month / category / type)
+-- Read by scripts/analise_risco.py so risk features cost O(months) instead of O(transactions).
+-- Kept in sync incrementally by a trigger: each INSERT/UPDATE/DELETE only touches
+-- the bucket(s) of the affected row. Backfill with: SELECT rebuild_transaction_rollups();
+
+CREATE TABLE IF NOT EXISTS transaction_monthly_rollups (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    month DATE NOT NULL, -- first day of the month (UTC)
+    category TEXT NOT NULL,
+    type TEXT NOT NULL CHECK (type IN ('income', 'expense')),
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    tx_count INTEGER NOT NULL DEFAULT 0,
+    recurring_total DECIMAL(14, 2) NOT NULL DEFAULT 0, -- part of total linked to a recurrence
+    PRIMARY KEY (user_id, month, category, type) -- also serves per-user month range reads
+);
+
+-- Enable RLS
+ALTER TABLE transaction_monthly_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Users can only READ their own rollups. Writes happen through the trigger below
+-- (SECURITY DEFINER) or the service role.
+CREATE POLICY "Users can view own rollups"
+    ON transaction_monthly_rollups FOR SELECT
+    USING (auth.uid() = user_id);
+
+-- 1. Apply a signed delta to a single bucket
+CREATE OR REPLACE FUNCTION apply_transaction_rollup_delta(
+    p_user_id UUID,
+    p_date TIMESTAMPTZ,
+    p_category TEXT,
+    p_type TEXT,
+    p_amount DECIMAL,
+    p_recurring BOOLEAN,
+    p_sign INTEGER
+) RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_month DATE := date_trunc('month', p_date AT TIME ZONE 'UTC')::date;
+    v_category TEXT := COALESCE(p_category, 'Outros');
+BEGIN
+    INSERT INTO transaction_monthly_rollups AS r
+        (user_id, month, category, type, total, tx_count, recurring_total)
+    VALUES (
+        p_user_id, v_month, v_category, p_type,
+        p_sign * p_amount,
+        p_sign,
+        CASE WHEN p_recurring THEN p_sign * p_amount ELSE 0 END
+    )
+    ON CONFLICT (user_id, month, category, type) DO UPDATE SET
+        total = r.total + EXCLUDED.total,
+        tx_count = r.tx_count + EXCLUDED.tx_count,
+        recurring_total = r.recurring_total + EXCLUDED.recurring_total;
+
+    -- Drop buckets that became empty so reads stay O(active months)
+    DELETE FROM transaction_monthly_rollups
+    WHERE user_id = p_user_id
+      AND month = v_month
+      AND category = v_category
+      AND type = p_type
+      AND tx_count <= 0;
+END;
+$$;
+
+-- 2. Trigger: remove OLD row from its bucket, add NEW row to its bucket
+CREATE OR REPLACE FUNCTION sync_transaction_monthly_rollups()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_transaction_rollup_delta(
+            OLD.user_id, OLD.date, OLD.category, OLD.type, OLD.amount,
+            OLD.recurrence_id IS NOT NULL, -1
+        );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_transaction_rollup_delta(
+            NEW.user_id, NEW.date, NEW.category, NEW.type, NEW.amount,
+            NEW.recurrence_id IS NOT NULL, 1
+        );
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_transaction_monthly_rollups ON transactions;
+CREATE TRIGGER trg_transaction_monthly_rollups
+    AFTER INSERT OR DELETE OR UPDATE OF user_id, date, category, type, amount, recurrence_id
+    ON transactions
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_transaction_monthly_rollups();
+
+-- 3. Rebuild (backfill) from raw transactions. NULL = every user.
+CREATE OR REPLACE FUNCTION rebuild_transaction_rollups(p_user_id UUID DEFAULT NULL)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    -- Writers wait until the backfill commits; otherwise a trigger upsert between
+    -- the DELETE and the INSERT would collide with (or be double-counted by) the rebuild
+    LOCK TABLE transactions IN SHARE MODE;
+
+    DELETE FROM transaction_monthly_rollups
+    WHERE p_user_id IS NULL OR user_id = p_user_id;
+
+    INSERT INTO transaction_monthly_rollups
+        (user_id, month, category, type, total, tx_count, recurring_total)
+    SELECT
+        user_id,
+        date_trunc('month', date AT TIME ZONE 'UTC')::date,
+        COALESCE(category, 'Outros'),
+        type,
+        SUM(amount),
+        COUNT(*),
+        COALESCE(SUM(amount) FILTER (WHERE recurrence_id IS NOT NULL), 0)
+    FROM transactions
+    WHERE p_user_id IS NULL OR user_id = p_user_id
+    GROUP BY 1, 2, 3, 4;
+END;
+$$;
+
+-- Only the service role may run a full rebuild or write deltas directly
+REVOKE EXECUTE ON FUNCTION rebuild_transaction_rollups(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION apply_transaction_rollup_delta(UUID, TIMESTAMPTZ, TEXT, TEXT, DECIMAL, BOOLEAN, INTEGER) FROM PUBLIC, anon, authenticated;
+
+GRANT SELECT ON TABLE transaction_monthly_rollups TO authenticated;
+
+-- Initial backfill
+SELECT rebuild_transaction_rollups();